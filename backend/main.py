@@ -9,21 +9,27 @@ This module provides a RESTful API for:
 API documentation is auto-generated at /docs (Swagger UI) and /redoc.
 """
 
+import asyncio
 import os
 import sys
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
 from typing import Optional
 
-from fastapi import FastAPI, HTTPException, Query
+import orjson
+from anyio import to_thread
+from fastapi import FastAPI, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 
 # Add the parent directory to path so we can import from ml.inference
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from ml.inference.predictor import BookRecommender
+from ml.inference.predictor import BookRecommender, available_cpus
 
+# Largest top_k accepted by /recommend
+MAX_TOP_K = 20
 
 # =============================================================================
 # Pydantic Models
@@ -104,8 +110,8 @@ class RecommendationRequest(BaseModel):
     top_k: int = Field(
         default=5, 
         ge=1, 
-        le=20, 
-        description="Number of recommendations to return (1-20)"
+        le=MAX_TOP_K, 
+        description=f"Number of recommendations to return (1-{MAX_TOP_K})"
     )
 
     model_config = {
@@ -139,6 +145,104 @@ class ErrorResponse(BaseModel):
     detail: str = Field(..., description="Error message")
 
 
+# =============================================================================
+# Request Batching
+# =============================================================================
+
+class RecommendationBatcher:
+    """
+    Dynamic batcher for recommendation requests.
+    
+    Requests that queue up while a batch is being scored (up to `max_batch` of
+    them) are scored together with a single call to
+    BookRecommender.get_recommendations_batch, run in the threadpool so the
+    event loop stays free. A lone request is dispatched immediately unless
+    `max_wait` is set, in which case the batcher waits up to that many
+    seconds for more requests.
+    """
+    
+    def __init__(
+        self,
+        recommender: BookRecommender,
+        max_batch: int = 32,
+        max_wait: float = 0.0
+    ):
+        self.recommender = recommender
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self) -> None:
+        """Start the background batching loop."""
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Stop the background batching loop."""
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+    
+    async def submit(self, book_index: int, top_k: int) -> tuple[dict, list[dict]]:
+        """Queue a request and wait for its (source_book, recommendations) result."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((book_index, top_k, future))
+        return await future
+    
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            
+            # Take whatever is already queued, then wait for more only while
+            # the window is open and the batch isn't full
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            
+            await self._process(batch)
+    
+    async def _process(self, batch: list) -> None:
+        book_indices = [book_index for book_index, _, _ in batch]
+        top_ks = [top_k for _, top_k, _ in batch]
+        
+        try:
+            results = await run_in_threadpool(
+                self.recommender.get_recommendations_batch, book_indices, top_ks
+            )
+        except Exception:
+            # Don't let one bad request fail the others: resolve them one by one
+            for book_index, top_k, future in batch:
+                try:
+                    result = await run_in_threadpool(
+                        self.recommender.get_recommendations, book_index, top_k
+                    )
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+            return
+        
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
 # =============================================================================
 # Application Setup
 # =============================================================================
@@ -146,15 +250,18 @@ class ErrorResponse(BaseModel):
 # Global recommender instance (singleton)
 recommender: Optional[BookRecommender] = None
 
+# Global batcher for /recommend requests
+batcher: Optional[RecommendationBatcher] = None
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Lifespan context manager for startup/shutdown events.
     
-    Loads the BookRecommender on startup.
+    Loads the BookRecommender and starts the request batcher on startup.
     """
-    global recommender
+    global recommender, batcher
     
     # Startup: Load the recommender
     print("🚀 Starting ReadNext API...")
@@ -169,16 +276,39 @@ async def lifespan(app: FastAPI):
     
     print(f"📂 Loading ML data from: {ml_path}")
     
+    # Opt into int8-quantized similarity scoring (FP32 is the default)
+    use_int8 = os.environ.get("USE_INT8_EMBEDDINGS", "").lower() in ("1", "true", "yes")
+    similarity_backend = os.environ.get("SIMILARITY_BACKEND", "numpy")
+    
     try:
-        recommender = BookRecommender(ml_path)
+        recommender = BookRecommender(
+            ml_path,
+            use_int8=use_int8,
+            similarity_backend=similarity_backend
+        )
         print(f"✅ Loaded {recommender.get_total_books()} books")
+        
+        # Scoring options only affect requests wider than the neighbor table
+        if (use_int8 or similarity_backend != "numpy") and recommender.is_precomputed(MAX_TOP_K):
+            print(
+                "⚠️ USE_INT8_EMBEDDINGS/SIMILARITY_BACKEND have no effect: every "
+                f"/recommend request (top_k <= {MAX_TOP_K}) is served from the "
+                "precomputed neighbor table"
+            )
     except Exception as e:
         print(f"❌ Failed to load recommender: {e}")
         raise
     
+    # Sync endpoints run in anyio's threadpool; size it for concurrent requests
+    to_thread.current_default_thread_limiter().total_tokens = 64
+    
+    batcher = RecommendationBatcher(recommender)
+    batcher.start()
+    
     yield
     
     # Shutdown
+    await batcher.stop()
     print("👋 Shutting down ReadNext API...")
 
 
@@ -253,7 +383,7 @@ Use the returned `index` field to get recommendations for a specific book.
         400: {"model": ErrorResponse, "description": "Invalid query"}
     }
 )
-async def search_books(
+def search_books(
     q: str = Query(
         ..., 
         min_length=1, 
@@ -274,10 +404,11 @@ async def search_books(
     
     try:
         books = recommender.search_books(q, limit=limit)
-        return SearchResponse(
-            query=q,
-            count=len(books),
-            books=[BookBase(**book) for book in books]
+        
+        # Book dicts are already well-formed, so skip per-book model validation
+        return Response(
+            content=orjson.dumps({"query": q, "count": len(books), "books": books}),
+            media_type="application/json"
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -303,18 +434,26 @@ ensuring relevant recommendations.
 )
 async def get_recommendations(request: RecommendationRequest):
     """Get book recommendations based on a source book."""
-    if recommender is None:
+    if recommender is None or batcher is None:
         raise HTTPException(status_code=503, detail="Service not ready")
     
     try:
-        source_book, recommendations = recommender.get_recommendations(
-            request.book_index, 
-            top_k=request.top_k
-        )
+        if recommender.is_precomputed(request.top_k):
+            # A neighbor table lookup: cheaper than a trip through the batcher
+            source_book, recommendations = recommender.get_recommendations(
+                request.book_index,
+                request.top_k
+            )
+        else:
+            source_book, recommendations = await batcher.submit(
+                request.book_index, 
+                request.top_k
+            )
         
-        return RecommendationResponse(
-            source_book=BookBase(**source_book),
-            recommendations=[RecommendedBook(**rec) for rec in recommendations]
+        # Serialize from precomputed book JSON, skipping per-book model validation
+        return Response(
+            content=recommender.recommendations_to_json(source_book, recommendations),
+            media_type="application/json"
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -332,7 +471,7 @@ async def get_recommendations(request: RecommendationRequest):
         404: {"model": ErrorResponse, "description": "Book not found"}
     }
 )
-async def get_book(book_index: int):
+def get_book(book_index: int):
     """Get a specific book by its index."""
     if recommender is None:
         raise HTTPException(status_code=503, detail="Service not ready")
@@ -353,7 +492,7 @@ async def get_book(book_index: int):
     summary="Get random books",
     description="Get a random selection of books for discovery and browsing."
 )
-async def get_random_books(
+def get_random_books(
     count: int = Query(
         default=10,
         ge=1,
@@ -367,7 +506,7 @@ async def get_random_books(
     
     try:
         books = recommender.get_random_books(count)
-        return [BookBase(**book) for book in books]
+        return Response(content=orjson.dumps(books), media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -377,11 +516,38 @@ async def get_random_books(
 # =============================================================================
 
 if __name__ == "__main__":
+    import argparse
+    
     import uvicorn
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info"
+    
+    parser = argparse.ArgumentParser(description="Run the ReadNext API")
+    parser.add_argument(
+        "--dev",
+        action="store_true",
+        help="Run a single worker with auto-reload (development only)"
     )
+    args = parser.parse_args()
+    
+    if args.dev:
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=8000,
+            reload=True,
+            log_level="info"
+        )
+    else:
+        # One process per core: the GIL serializes request handling within a
+        # worker, while the memory-mapped embeddings are shared between them.
+        # os.cpu_count() reports the host's CPUs inside a container, so use the
+        # affinity mask, or WEB_CONCURRENCY to match a CPU quota.
+        workers = int(os.environ.get("WEB_CONCURRENCY") or available_cpus())
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=8000,
+            workers=workers,
+            loop="uvloop",
+            http="httptools",
+            log_level="info"
+        )
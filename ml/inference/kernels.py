@@ -0,0 +1,105 @@
+"""
+Numba-compiled similarity kernels for BookRecommender.
+
+All kernels expect L2-normalized float32 embeddings, so the cosine
+similarity of two rows is their dot product.
+"""
+
+import math
+
+import numpy as np
+from numba import njit, prange
+
+# Number of dimensions accumulated between early-abort checks
+CHUNK_SIZE = 16
+
+
+@njit(cache=True)
+def topk_cosine(
+    query: np.ndarray,
+    block: np.ndarray,
+    k: int,
+    exclude: int = -1,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Find the k rows of a block most similar to a query, skipping hopeless rows early.
+
+    Dot products are accumulated CHUNK_SIZE dimensions at a time. Because both
+    vectors are unit-length, the remaining dimensions can add at most
+    ||query_rest|| * sqrt(1 - ||row_done||^2) (Cauchy-Schwarz), so a row is
+    abandoned as soon as that optimistic similarity cannot beat the current
+    k-th best score.
+
+    Args:
+        query: Normalized query vector, shape (dim,).
+        block: Normalized candidate rows, shape (n, dim).
+        k: Number of neighbors to return (must be <= number of candidates).
+        exclude: Row of the block to skip (e.g. the query itself), or -1.
+
+    Returns:
+        Tuple of (row indices, similarities), sorted by descending similarity.
+    """
+    n, dim = block.shape
+    n_chunks = (dim + CHUNK_SIZE - 1) // CHUNK_SIZE
+
+    # tail_sq[c] = squared norm of the query from chunk c onwards
+    tail_sq = np.zeros(n_chunks + 1)
+    for c in range(n_chunks - 1, -1, -1):
+        acc = 0.0
+        for j in range(c * CHUNK_SIZE, min(dim, (c + 1) * CHUNK_SIZE)):
+            acc += query[j] * query[j]
+        tail_sq[c] = tail_sq[c + 1] + acc
+
+    # Bounded buffer of the k best candidates; min_pos tracks the weakest entry
+    top_sim = np.full(k, -np.inf)
+    top_idx = np.full(k, -1, dtype=np.int64)
+    min_pos = 0
+
+    for i in range(n):
+        if i == exclude:
+            continue
+
+        threshold = top_sim[min_pos]
+        dot = 0.0
+        row_sq = 0.0
+        pruned = False
+        for c in range(n_chunks):
+            for j in range(c * CHUNK_SIZE, min(dim, (c + 1) * CHUNK_SIZE)):
+                x = block[i, j]
+                dot += query[j] * x
+                row_sq += x * x
+            if c + 1 < n_chunks:
+                optimistic = dot + math.sqrt(tail_sq[c + 1] * max(0.0, 1.0 - row_sq))
+                if optimistic <= threshold:
+                    pruned = True
+                    break
+
+        if pruned or dot <= threshold:
+            continue
+
+        top_sim[min_pos] = dot
+        top_idx[min_pos] = i
+        for m in range(k):
+            if top_sim[m] < top_sim[min_pos]:
+                min_pos = m
+
+    order = np.argsort(-top_sim)
+    return top_idx[order], top_sim[order]
+
+
+@njit(cache=True, parallel=True, fastmath=True, boundscheck=False)
+def cos_sim_block(query: np.ndarray, block: np.ndarray, out: np.ndarray) -> None:
+    """
+    Write the cosine similarity of a query against every row of a block into out.
+
+    Args:
+        query: Normalized query vector, shape (dim,).
+        block: Normalized candidate rows, shape (n, dim).
+        out: Preallocated output buffer with at least n entries.
+    """
+    n, dim = block.shape
+    for i in prange(n):
+        acc = 0.0
+        for j in range(dim):
+            acc += query[j] * block[i, j]
+        out[i] = acc
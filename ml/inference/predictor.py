@@ -7,13 +7,139 @@ This module provides the BookRecommender class that handles:
 - Book recommendation using cluster-based KNN
 """
 
+import hashlib
+import os
 import pickle
+import threading
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
 import numpy as np
-import pandas as pd
-from sklearn.neighbors import NearestNeighbors
+import orjson
+
+# Serving arrays exported next to model.pkl (see ml/training/export_arrays.py)
+EMBEDDINGS_FILE = "embeddings_by_cluster.f32.npy"  # Normalized, rows grouped by cluster
+CLUSTER_PERM_FILE = "cluster_perm.npy"  # Book index stored in each row
+CLUSTER_OFFSETS_FILE = "cluster_offsets.npy"  # Cluster c owns rows offsets[c]:offsets[c + 1]
+CLUSTER_LABELS_FILE = "cluster_labels.npy"  # Cluster of each book, by book index
+EMBEDDINGS_I8_FILE = "embeddings_by_cluster.i8.npy"  # int8-quantized EMBEDDINGS_FILE
+MODEL_CONFIG_FILE = "model_config.pkl"  # model.pkl without arrays and estimators
+NEIGHBORS_IDX_FILE = "neighbors_idx.npy"  # Top NEIGHBOR_TABLE_WIDTH neighbors of each book
+NEIGHBORS_SIM_FILE = "neighbors_sim.npy"  # Their similarities, best first
+
+# Number of precomputed neighbors per book (the API's maximum top_k)
+NEIGHBOR_TABLE_WIDTH = 20
+
+# Files that must all exist to serve without unpickling model.pkl
+EXPORTED_FILES = (
+    EMBEDDINGS_FILE,
+    CLUSTER_PERM_FILE,
+    CLUSTER_OFFSETS_FILE,
+    CLUSTER_LABELS_FILE,
+    MODEL_CONFIG_FILE,
+)
+
+# model_config.pkl key holding the SHA-256 of the model.pkl it was exported from
+SOURCE_HASH_KEY = "source_sha256"
+
+
+def file_sha256(path: Path) -> str:
+    """Hex SHA-256 digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on (its affinity mask, unlike os.cpu_count())."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def normalize_embeddings(embeddings: np.ndarray) -> np.ndarray:
+    """L2-normalize each row and return a C-contiguous float32 copy."""
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(embeddings / norms, dtype=np.float32)
+
+
+def quantize_int8(embeddings: np.ndarray) -> np.ndarray:
+    """Quantize each row to int8 using a per-row scale of max(|x|) / 127."""
+    scale = np.abs(embeddings).max(axis=1, keepdims=True) / 127.0
+    scale[scale == 0] = 1.0
+    return np.round(embeddings / scale).astype(np.int8)
+
+
+def group_by_cluster(cluster_labels: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Order books so that each cluster occupies a contiguous run of rows.
+    
+    Returns:
+        Tuple of (perm, offsets): row r holds book perm[r], and cluster c owns
+        rows offsets[c]:offsets[c + 1]. Books keep their relative order within
+        a cluster.
+    """
+    perm = np.argsort(cluster_labels, kind="stable")
+    offsets = np.searchsorted(cluster_labels[perm], np.arange(cluster_labels.max() + 2))
+    return perm, offsets
+
+
+def build_neighbor_table(
+    emb_sorted: np.ndarray,
+    perm: np.ndarray,
+    offsets: np.ndarray,
+    width: int = NEIGHBOR_TABLE_WIDTH,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Precompute every book's nearest neighbors within its cluster.
+    
+    Each cluster is scored with one block @ block.T product; the diagonal is
+    masked so a book is never its own neighbor.
+    
+    Returns:
+        Tuple of (neighbor_idx, neighbor_sim), both of shape (n_books, width)
+        and indexed by book index: int32 global book indices and float32
+        similarities, best first. Books whose cluster has fewer than width
+        other members are padded with -1 and NaN.
+    """
+    n_books = len(perm)
+    neighbor_idx = np.full((n_books, width), -1, dtype=np.int32)
+    neighbor_sim = np.full((n_books, width), np.nan, dtype=np.float32)
+    
+    for start, end in zip(offsets[:-1], offsets[1:]):
+        k = min(width, end - start - 1)
+        if k <= 0:
+            continue
+        
+        block = emb_sorted[start:end]
+        sims = block @ block.T
+        np.fill_diagonal(sims, -np.inf)
+        
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top_sims = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_sims, axis=1)
+        
+        books = perm[start:end]
+        neighbor_idx[books, :k] = perm[start + np.take_along_axis(top, order, axis=1)]
+        neighbor_sim[books, :k] = np.take_along_axis(top_sims, order, axis=1)
+    
+    return neighbor_idx, neighbor_sim
+
+
+@dataclass(slots=True, frozen=True)
+class Book:
+    """Immutable book metadata, prepared once when the recommender loads."""
+    index: int
+    title: str
+    author: str
+    description: str
+    genres: tuple[str, ...]
 
 
 class BookRecommender:
@@ -24,25 +150,63 @@ class BookRecommender:
     within the same cluster, providing more relevant recommendations.
     
     Attributes:
-        cat_data (pd.DataFrame): Book metadata (Title, Author, Description, Genres)
-        embeddings (np.ndarray): Book embeddings/features
+        books (list[Book]): Book metadata (title, author, description, genres) by index
+        emb_sorted (np.ndarray): L2-normalized float32 embeddings with rows grouped by
+            cluster (memory-mapped from EMBEDDINGS_FILE when it has been exported)
+        perm (np.ndarray): Book index stored in each row of emb_sorted
+        inv_perm (np.ndarray): Row of emb_sorted holding each book
+        cluster_offsets (np.ndarray): Cluster c owns rows cluster_offsets[c]:cluster_offsets[c + 1]
+        similarity_backend (str): FP32 similarity kernel ("numpy", "simsimd" or "numba")
+        use_int8 (bool): Whether similarity is scored on int8-quantized embeddings
+        emb_i8 (np.ndarray): Row-wise int8-quantized emb_sorted (only when use_int8 is set;
+            quantized on first use if no persisted copy was loaded)
         cluster_labels (np.ndarray): Cluster assignments for each book
-        nn_model: Pre-trained NearestNeighbors model
-        kmeans_model: Pre-trained KMeans clustering model
+        neighbor_idx (np.ndarray): Precomputed top neighbors of each book (see
+            build_neighbor_table); requests up to its width are served from it
+        neighbor_sim (np.ndarray): Similarities matching neighbor_idx
+        config (dict): Training configuration from the model package
     """
     
-    def __init__(self, ml_dir: Optional[Path] = None):
+    SIMILARITY_BACKENDS = ("numpy", "simsimd", "numba")
+    
+    # Clusters larger than this use the early-abort top-k kernel. Disabled by
+    # default: on our 384-d embeddings the bound rarely prunes before the last
+    # few chunks, so a full BLAS scan of the block is faster.
+    EARLY_ABORT_MIN_CLUSTER_SIZE: Optional[int] = None
+    
+    # Clusters larger than this are scored in row chunks across a thread pool
+    PARALLEL_MIN_CLUSTER_SIZE = 2000
+    
+    def __init__(
+        self,
+        ml_dir: Optional[Path] = None,
+        use_int8: bool = False,
+        similarity_backend: str = "numpy",
+    ):
         """
         Initialize the BookRecommender by loading all required data and models.
         
         Args:
             ml_dir: Path to the ML directory containing 'data' and 'training' folders.
                    If None, defaults to the parent of the inference directory.
+            use_int8: If True, score similarity on int8-quantized embeddings with
+                   SimSIMD's integer cosine kernel instead of the FP32 path.
+            similarity_backend: Kernel used for FP32 cosine similarity. "numpy" uses
+                   a BLAS matrix-vector product, "simsimd" uses SimSIMD's
+                   hardware-dispatched cosine kernel and "numba" uses a
+                   parallel JIT-compiled kernel.
         
         Raises:
             FileNotFoundError: If required pickle files are not found.
             RuntimeError: If there's an error loading the models.
+            ValueError: If similarity_backend is not supported.
         """
+        if similarity_backend not in self.SIMILARITY_BACKENDS:
+            raise ValueError(
+                f"Unknown similarity backend '{similarity_backend}'. "
+                f"Choose from: {', '.join(self.SIMILARITY_BACKENDS)}"
+            )
+        
         if ml_dir is None:
             # Default: assume we're in ml/inference, so go up one level
             ml_dir = Path(__file__).parent.parent
@@ -50,10 +214,16 @@ class BookRecommender:
             ml_dir = Path(ml_dir)
         
         self.ml_dir = ml_dir
+        self.use_int8 = use_int8
+        self.similarity_backend = similarity_backend
+        self._rng = np.random.default_rng()
+        self._n_workers = available_cpus()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lazy_lock = threading.Lock()
         self._load_data()
         self._load_model()
         
-        print(f"✅ BookRecommender initialized with {len(self.cat_data)} books")
+        print(f"✅ BookRecommender initialized with {len(self.books)} books")
     
     def _load_data(self) -> None:
         """Load book metadata and processed data."""
@@ -65,10 +235,46 @@ class BookRecommender:
             raise FileNotFoundError(f"Book metadata not found: {cat_data_path}")
         
         with open(cat_data_path, "rb") as f:
-            self.cat_data = pickle.load(f)
+            cat_data = pickle.load(f)
         
         # Normalize column names (handle different possible column names)
-        self.cat_data.columns = [col.strip() for col in self.cat_data.columns]
+        cat_data.columns = [col.strip() for col in cat_data.columns]
+        
+        # Convert the DataFrame to plain objects once; pandas is only used at load
+        if "Genres" in cat_data.columns:
+            genres = [tuple(self._normalize_genres(g)) for g in cat_data["Genres"].tolist()]
+        else:
+            genres = [() for _ in range(len(cat_data))]
+        self.books: list[Book] = [
+            Book(index, title, author, description, book_genres)
+            for index, (title, author, description, book_genres) in enumerate(zip(
+                self._text_column(cat_data, ["Book", "Title"], "Unknown"),
+                self._text_column(cat_data, ["Author"], "Unknown"),
+                self._text_column(cat_data, ["Description"], ""),
+                genres,
+            ))
+        ]
+        
+        # Details dict and serialized JSON for every book, reused when building
+        # API responses. Genres are kept as tuples so the shared dicts can't be
+        # mutated through a returned dict; callers get their own genres lists.
+        self._book_dicts: list[dict] = [self._build_book(i) for i in range(len(self.books))]
+        self._book_json: list[bytes] = [orjson.dumps(book) for book in self._book_dicts]
+        
+        # Search index: lowercased titles joined by NUL bytes, so a query is one
+        # bytes.find over the whole corpus. _title_starts[i] is where title i begins.
+        self._title_blob = None
+        for col_name in ["Book", "Title", "book", "title"]:
+            if col_name in cat_data.columns:
+                encoded = [
+                    title.lower().encode() if isinstance(title, str) else b""
+                    for title in cat_data[col_name].tolist()
+                ]
+                self._title_blob = b"\0".join(encoded)
+                self._title_starts = [0]
+                for title in encoded[:-1]:
+                    self._title_starts.append(self._title_starts[-1] + len(title) + 1)
+                break
         
         # Load processed data (optional, for potential future use)
         processed_data_path = data_dir / "processed_data.pkl"
@@ -83,28 +289,191 @@ class BookRecommender:
             self.processed_data = None
     
     def _load_model(self) -> None:
-        """Load the trained model package."""
-        model_path = self.ml_dir / "training" / "model.pkl"
+        """
+        Load the trained model arrays.
         
-        if not model_path.exists():
+        Prefers the files written by ml/training/export_arrays.py: the arrays
+        are memory-mapped, so the OS can share their pages between worker
+        processes and model.pkl is never unpickled. Falls back to model.pkl
+        when the files are missing or were exported from a different model.pkl.
+        """
+        training_dir = self.ml_dir / "training"
+        model_path = training_dir / "model.pkl"
+        
+        self.emb_i8 = None
+        self.neighbor_idx = None
+        model_config = self._read_model_config(training_dir, model_path)
+        if model_config is not None:
+            self._load_exported_arrays(training_dir, model_config)
+        elif model_path.exists():
+            self._load_model_package(model_path)
+        else:
             raise FileNotFoundError(f"Model not found: {model_path}")
         
+        self.inv_perm = np.empty_like(self.perm)
+        self.inv_perm[self.perm] = np.arange(len(self.perm))
+        
+        # Build the neighbor table at startup if it wasn't exported
+        if self.neighbor_idx is None:
+            self.neighbor_idx, self.neighbor_sim = build_neighbor_table(
+                self.emb_sorted, self.perm, self.cluster_offsets
+            )
+        
+        # Output buffer for the numba kernel (allocated on first use), shared
+        # under a lock because numba's default (workqueue) threading layer does
+        # not support concurrent calls
+        self._out_buf: Optional[np.ndarray] = None
+        self._numba_lock = threading.Lock()
+        
+        # Validate data consistency
+        if len(self.emb_sorted) != len(self.books):
+            raise RuntimeError(
+                f"Data mismatch: {len(self.emb_sorted)} embeddings vs "
+                f"{len(self.books)} books in metadata"
+            )
+    
+    @staticmethod
+    def _read_model_config(training_dir: Path, model_path: Path) -> Optional[dict]:
+        """
+        Read model_config.pkl if the exported arrays can be served.
+        
+        Returns:
+            The exported model config, or None if any exported file is missing
+            or model.pkl has changed since the export (e.g. after retraining).
+        """
+        if not all((training_dir / name).exists() for name in EXPORTED_FILES):
+            return None
+        
+        with open(training_dir / MODEL_CONFIG_FILE, "rb") as f:
+            model_config = pickle.load(f)
+        
+        if model_path.exists() and model_config.get(SOURCE_HASH_KEY) != file_sha256(model_path):
+            print(
+                f"⚠️ Exported arrays in {training_dir} don't match model.pkl, loading model.pkl "
+                f"instead. Re-run ml/training/export_arrays.py to refresh them."
+            )
+            return None
+        
+        return model_config
+    
+    def _load_exported_arrays(self, training_dir: Path, model_config: dict) -> None:
+        """Memory-map the exported serving arrays."""
+        self.config = model_config.get("config", {})
+        
+        # Normalized embeddings (so cosine similarity is a dot product), with each
+        # cluster's rows stored contiguously so a cluster block is a plain slice
+        self.emb_sorted = np.load(training_dir / EMBEDDINGS_FILE, mmap_mode="r")
+        self.cluster_labels = np.load(training_dir / CLUSTER_LABELS_FILE, mmap_mode="r")
+        self.perm = np.load(training_dir / CLUSTER_PERM_FILE)
+        self.cluster_offsets = np.load(training_dir / CLUSTER_OFFSETS_FILE)
+        
+        emb_i8_path = training_dir / EMBEDDINGS_I8_FILE
+        if self.use_int8 and emb_i8_path.exists():
+            self.emb_i8 = np.load(emb_i8_path, mmap_mode="r")
+        
+        if (training_dir / NEIGHBORS_IDX_FILE).exists() and (training_dir / NEIGHBORS_SIM_FILE).exists():
+            self.neighbor_idx = np.load(training_dir / NEIGHBORS_IDX_FILE, mmap_mode="r")
+            self.neighbor_sim = np.load(training_dir / NEIGHBORS_SIM_FILE, mmap_mode="r")
+    
+    def _load_model_package(self, model_path: Path) -> None:
+        """Build the serving arrays in memory from the pickled model package."""
         with open(model_path, "rb") as f:
             package = pickle.load(f)
         
-        # Extract components from model package
-        self.embeddings = package["embeddings"]
         self.cluster_labels = package["cluster_labels"]
-        self.nn_model = package.get("nn_model")
-        self.kmeans_model = package.get("kmeans_model")
         self.config = package.get("config", {})
+        embeddings = package["embeddings"]
+        emb_i8 = package.get("embeddings_i8")
         
-        # Validate data consistency
-        if len(self.embeddings) != len(self.cat_data):
-            raise RuntimeError(
-                f"Data mismatch: {len(self.embeddings)} embeddings vs "
-                f"{len(self.cat_data)} books in metadata"
+        # Older packages also hold fitted NearestNeighbors/KMeans estimators
+        # (the former with its own copy of the embeddings). Inference doesn't
+        # use them, so release them before building the serving arrays.
+        del package
+        
+        self.perm, self.cluster_offsets = group_by_cluster(self.cluster_labels)
+        self.emb_sorted = normalize_embeddings(embeddings)[self.perm]
+        
+        # Prefer the int8 copy persisted at training time
+        if self.use_int8 and emb_i8 is not None:
+            self.emb_i8 = np.ascontiguousarray(emb_i8[self.perm], dtype=np.int8)
+    
+    @staticmethod
+    def _text_column(cat_data, names: list[str], default: str) -> list[str]:
+        """Return the first matching metadata column as strings, or a default-filled list."""
+        for name in names:
+            if name in cat_data.columns:
+                return cat_data[name].astype(str).tolist()
+        return [default] * len(cat_data)
+    
+    @staticmethod
+    def _normalize_genres(genres) -> list[str]:
+        """Normalize a genres cell (list, comma-separated string or iterable) to a list."""
+        if isinstance(genres, str):
+            return [g.strip() for g in genres.split(",")]
+        if isinstance(genres, list):
+            return genres
+        return list(genres) if genres else []
+    
+    def _cluster_rows(self, book_index: int) -> tuple[int, int]:
+        """Start and end rows of a book's cluster in emb_sorted."""
+        cluster_id = self.cluster_labels[book_index]
+        return int(self.cluster_offsets[cluster_id]), int(self.cluster_offsets[cluster_id + 1])
+    
+    def _cluster_similarities(self, start: int, end: int, row: int) -> np.ndarray:
+        """Cosine similarity between row and every row in start:end of emb_sorted."""
+        # simsimd and numba back opt-in kernels only, so import them on first use
+        if self.use_int8:
+            import simsimd
+            
+            emb_i8 = self._get_emb_i8()
+            distances = simsimd.cdist(
+                emb_i8[row].reshape(1, -1),
+                emb_i8[start:end],
+                metric="cosine",
             )
+            return 1.0 - np.asarray(distances).ravel()
+        
+        block = self.emb_sorted[start:end]
+        query = self.emb_sorted[row]
+        
+        if self.similarity_backend == "simsimd":
+            import simsimd
+            
+            distances = simsimd.cdist(query.reshape(1, -1), block, metric="cosine")
+            return 1.0 - np.asarray(distances).ravel()
+        
+        if self.similarity_backend == "numba":
+            from ml.inference.kernels import cos_sim_block
+            
+            with self._numba_lock:
+                if self._out_buf is None:
+                    max_cluster_size = int(np.diff(self.cluster_offsets).max())
+                    self._out_buf = np.empty(max_cluster_size, dtype=np.float32)
+                cos_sim_block(query, block, self._out_buf)
+                return self._out_buf[:len(block)].copy()
+        
+        # Rows are unit-length, so a dot product is the cosine similarity
+        if len(block) > self.PARALLEL_MIN_CLUSTER_SIZE and self._n_workers > 1:
+            # A single GEMV is bandwidth-bound on one core; split the rows so
+            # every core streams its own chunk (NumPy releases the GIL)
+            chunks = np.array_split(block, self._n_workers)
+            return np.concatenate(list(self._get_pool().map(lambda chunk: chunk @ query, chunks)))
+        
+        return block @ query
+    
+    def _get_emb_i8(self) -> np.ndarray:
+        """int8 embeddings, quantized on first use if no persisted copy was loaded."""
+        with self._lazy_lock:
+            if self.emb_i8 is None:
+                self.emb_i8 = quantize_int8(self.emb_sorted)
+            return self.emb_i8
+    
+    def _get_pool(self) -> ThreadPoolExecutor:
+        """Thread pool for chunked GEMVs, created the first time a cluster needs it."""
+        with self._lazy_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self._n_workers)
+            return self._pool
     
     def get_book_by_index(self, index: int) -> dict:
         """
@@ -119,26 +488,23 @@ class BookRecommender:
         Raises:
             ValueError: If index is out of range.
         """
-        if not 0 <= index < len(self.cat_data):
+        if not 0 <= index < len(self.books):
             raise ValueError(
-                f"Book index {index} out of range. Valid range: 0-{len(self.cat_data) - 1}"
+                f"Book index {index} out of range. Valid range: 0-{len(self.books) - 1}"
             )
         
-        row = self.cat_data.iloc[index]
-        
-        # Handle genres - could be list or string
-        genres = row.get("Genres", [])
-        if isinstance(genres, str):
-            genres = [g.strip() for g in genres.split(",")]
-        elif not isinstance(genres, list):
-            genres = list(genres) if genres else []
-        
+        book = self._book_dicts[int(index)]
+        return {**book, "genres": list(book["genres"])}
+    
+    def _build_book(self, index: int) -> dict:
+        """Build the shared (read-only) details dict for a book."""
+        book = self.books[index]
         return {
-            "index": int(index),
-            "title": str(row.get("Book", row.get("Title", "Unknown"))),
-            "author": str(row.get("Author", "Unknown")),
-            "description": str(row.get("Description", "")),
-            "genres": genres,
+            "index": book.index,
+            "title": book.title,
+            "author": book.author,
+            "description": book.description,
+            "genres": book.genres,
         }
     
     def search_books(self, query: str, limit: int = 10) -> list[dict]:
@@ -157,22 +523,23 @@ class BookRecommender:
         
         query = query.strip().lower()
         
-        # Get the title column (handle different possible names)
-        title_col = None
-        for col_name in ["Book", "Title", "book", "title"]:
-            if col_name in self.cat_data.columns:
-                title_col = col_name
-                break
-        
-        if title_col is None:
+        if self._title_blob is None:
             raise RuntimeError("Could not find title column in book data")
         
-        # Case-insensitive search
-        mask = self.cat_data[title_col].str.lower().str.contains(query, na=False)
-        matching_indices = self.cat_data[mask].index.tolist()
+        # A NUL can only match across title boundaries
+        needle = query.encode()
+        if b"\0" in needle:
+            return []
         
-        # Limit results
-        matching_indices = matching_indices[:limit]
+        # Case-insensitive substring match, resuming after each matching title
+        matching_indices = []
+        pos = self._title_blob.find(needle)
+        while pos != -1 and len(matching_indices) < limit:
+            idx = bisect_right(self._title_starts, pos) - 1
+            matching_indices.append(idx)
+            if idx + 1 == len(self._title_starts):
+                break
+            pos = self._title_blob.find(needle, self._title_starts[idx + 1])
         
         return [self.get_book_by_index(idx) for idx in matching_indices]
     
@@ -185,7 +552,9 @@ class BookRecommender:
         Get book recommendations based on a source book.
         
         Uses cluster-based KNN: finds the most similar books within
-        the same cluster as the source book.
+        the same cluster as the source book. Requests for up to
+        NEIGHBOR_TABLE_WIDTH books are answered from the precomputed neighbor
+        table; use_int8 and similarity_backend only apply to wider requests.
         
         Args:
             book_index: Index of the source book.
@@ -198,54 +567,196 @@ class BookRecommender:
             ValueError: If book_index is out of range.
         """
         # Validate index
-        if not 0 <= book_index < len(self.cat_data):
+        if not 0 <= book_index < len(self.books):
             raise ValueError(
-                f"Book index {book_index} out of range. Valid range: 0-{len(self.cat_data) - 1}"
+                f"Book index {book_index} out of range. Valid range: 0-{len(self.books) - 1}"
             )
         
         # Get source book details
         source_book = self.get_book_by_index(book_index)
         
-        # Get cluster of the source book
-        cluster_id = self.cluster_labels[book_index]
-        
-        # Get all books in the same cluster (excluding source)
-        same_cluster_indices = np.where(self.cluster_labels == cluster_id)[0]
-        same_cluster_indices = same_cluster_indices[same_cluster_indices != book_index]
+        # Rows of the source book's cluster (source book included)
+        start, end = self._cluster_rows(book_index)
+        row = int(self.inv_perm[book_index])
         
-        if len(same_cluster_indices) == 0:
+        if end - start <= 1:
             return source_book, []
         
-        # Fit Nearest Neighbors within the cluster
-        n_neighbors = min(top_k, len(same_cluster_indices))
-        nn_cluster = NearestNeighbors(
-            n_neighbors=n_neighbors,
-            metric="cosine",
-            algorithm="brute"
-        )
-        nn_cluster.fit(self.embeddings[same_cluster_indices])
+        n_neighbors = max(0, min(top_k, end - start - 1))
         
-        # Query neighbors
-        distances, indices = nn_cluster.kneighbors(
-            self.embeddings[book_index].reshape(1, -1)
+        if n_neighbors <= self.neighbor_idx.shape[1]:
+            return source_book, self._format_recommendations(
+                self.neighbor_idx[book_index, :n_neighbors],
+                self.neighbor_sim[book_index, :n_neighbors],
+            )
+        
+        early_abort = (
+            not self.use_int8
+            and self.EARLY_ABORT_MIN_CLUSTER_SIZE is not None
+            and end - start > self.EARLY_ABORT_MIN_CLUSTER_SIZE
         )
         
-        # Convert local cluster indices to global dataset indices
-        recommended_indices = same_cluster_indices[indices[0]]
-        similarity_scores = 1 - distances[0]  # Convert distance to similarity
+        if early_abort:
+            from ml.inference.kernels import topk_cosine
+            
+            # Large cluster: skip candidates that provably cannot reach the top-k
+            top, similarity_scores = topk_cosine(
+                self.emb_sorted[row],
+                self.emb_sorted[start:end],
+                n_neighbors,
+                row - start,
+            )
+        else:
+            # Cosine similarity against every book in the cluster
+            sims = self._cluster_similarities(start, end, row)
+            
+            # Exclude the source book itself
+            sims[row - start] = -np.inf
+            
+            top = self._top_k(sims, n_neighbors)
+            similarity_scores = sims[top]
+        
+        recommended_indices = self.perm[start + top]
+        
+        return source_book, self._format_recommendations(recommended_indices, similarity_scores)
+    
+    def is_precomputed(self, top_k: int) -> bool:
+        """Whether requests for top_k recommendations are served from the neighbor table."""
+        return top_k <= self.neighbor_idx.shape[1]
+    
+    def get_recommendations_batch(
+        self,
+        book_indices: list[int],
+        top_ks: list[int]
+    ) -> list[tuple[dict, list[dict]]]:
+        """
+        Get recommendations for several source books at once.
+        
+        Requests that fit in the precomputed neighbor table are answered from
+        it. The remaining source books that share a cluster are scored together
+        with a single matrix-matrix product against the cluster block, which
+        amortizes the per-call overhead of one matrix-vector product per
+        request. Always uses the FP32 embeddings.
+        
+        Args:
+            book_indices: Indices of the source books.
+            top_ks: Number of recommendations to return for each source book.
         
-        # Build recommendation list
-        recommendations = []
-        for idx, score in zip(recommended_indices, similarity_scores):
-            book = self.get_book_by_index(int(idx))
-            book["similarity_score"] = round(float(score), 4)
-            recommendations.append(book)
+        Returns:
+            List of (source_book_dict, list_of_recommended_book_dicts) tuples,
+            in the same order as book_indices.
         
-        return source_book, recommendations
+        Raises:
+            ValueError: If any book index is out of range.
+        """
+        for book_index in book_indices:
+            if not 0 <= book_index < len(self.books):
+                raise ValueError(
+                    f"Book index {book_index} out of range. Valid range: 0-{len(self.books) - 1}"
+                )
+        
+        results: list[tuple[dict, list[dict]]] = [None] * len(book_indices)
+        
+        # Serve from the neighbor table where possible, and group the remaining
+        # request positions by the cluster of their source book
+        by_cluster: dict[int, list[int]] = {}
+        for pos, book_index in enumerate(book_indices):
+            start, end = self._cluster_rows(book_index)
+            n_neighbors = max(0, min(top_ks[pos], end - start - 1))
+            if n_neighbors <= self.neighbor_idx.shape[1]:
+                recommendations = self._format_recommendations(
+                    self.neighbor_idx[book_index, :n_neighbors],
+                    self.neighbor_sim[book_index, :n_neighbors],
+                )
+                results[pos] = (self.get_book_by_index(book_index), recommendations)
+            else:
+                by_cluster.setdefault(int(self.cluster_labels[book_index]), []).append(pos)
+        
+        for cluster_id, positions in by_cluster.items():
+            start = int(self.cluster_offsets[cluster_id])
+            end = int(self.cluster_offsets[cluster_id + 1])
+            rows = self.inv_perm[[book_indices[pos] for pos in positions]]
+            
+            # (cluster_size, n_queries) similarities in one GEMM, sources excluded
+            sims = self.emb_sorted[start:end] @ self.emb_sorted[rows].T
+            sims[rows - start, np.arange(len(rows))] = -np.inf
+            
+            for col, pos in enumerate(positions):
+                column = sims[:, col]
+                top = self._top_k(column, min(top_ks[pos], end - start - 1))
+                recommendations = self._format_recommendations(
+                    self.perm[start + top], column[top]
+                )
+                results[pos] = (self.get_book_by_index(book_indices[pos]), recommendations)
+        
+        return results
+    
+    @staticmethod
+    def _top_k(sims: np.ndarray, k: int) -> np.ndarray:
+        """
+        Positions of the k largest similarities, best first.
+        
+        Uses argpartition (O(n)) and only sorts the k winners, instead of
+        sorting every candidate.
+        """
+        if k <= 0:
+            return np.empty(0, dtype=np.intp)
+        if k >= len(sims):
+            return np.argsort(-sims)
+        top = np.argpartition(-sims, k - 1)[:k]
+        return top[np.argsort(-sims[top])]
+    
+    def _format_recommendations(
+        self,
+        indices: np.ndarray,
+        scores: np.ndarray
+    ) -> list[dict]:
+        """Build recommendation dicts from global book indices and similarity scores."""
+        # Indices come from our own arrays, so skip get_book_by_index's range
+        # check; formatting to 4 decimals rounds like round(score, 4), but faster
+        book_dicts = self._book_dicts
+        return [
+            {
+                **book_dicts[idx],
+                "genres": list(book_dicts[idx]["genres"]),
+                "similarity_score": float(f"{score:.4f}"),
+            }
+            for idx, score in zip(indices.tolist(), scores.tolist())
+        ]
+    
+    def recommendations_to_json(
+        self,
+        source_book: dict,
+        recommendations: list[dict]
+    ) -> bytes:
+        """
+        Serialize a recommendation result to JSON bytes.
+        
+        Splices the precomputed per-book JSON instead of re-serializing book
+        metadata, producing the same document as RecommendationResponse.
+        
+        Args:
+            source_book: Source book dict as returned by get_recommendations.
+            recommendations: Recommended book dicts as returned by get_recommendations.
+        
+        Returns:
+            JSON object with "source_book" and "recommendations" keys.
+        """
+        recommended = [
+            self._book_json[rec["index"]][:-1]
+            + b',"similarity_score":'
+            + orjson.dumps(rec["similarity_score"])
+            + b"}"
+            for rec in recommendations
+        ]
+        return (
+            b'{"source_book":' + self._book_json[source_book["index"]]
+            + b',"recommendations":[' + b",".join(recommended) + b"]}"
+        )
     
     def get_total_books(self) -> int:
         """Return the total number of books in the dataset."""
-        return len(self.cat_data)
+        return len(self.books)
     
     def get_random_books(self, count: int = 10) -> list[dict]:
         """
@@ -257,8 +768,8 @@ class BookRecommender:
         Returns:
             List of book dictionaries.
         """
-        count = min(count, len(self.cat_data))
-        random_indices = np.random.choice(len(self.cat_data), size=count, replace=False)
+        count = min(count, len(self.books))
+        random_indices = self._rng.choice(len(self.books), size=count, replace=False)
         return [self.get_book_by_index(int(idx)) for idx in random_indices]
 
 
@@ -0,0 +1,91 @@
+"""
+Export serving arrays from the trained model package.
+
+Writes, next to model.pkl:
+- the L2-normalized embeddings as a float32, C-contiguous .npy file with the
+  rows of each cluster stored contiguously, plus an int8-quantized copy
+- the row -> book index permutation and the per-cluster row offsets
+- the cluster label of every book
+- each book's top NEIGHBOR_TABLE_WIDTH neighbors within its cluster and their
+  similarities, so most recommendation requests are plain lookups
+- model_config.pkl: the package's small metadata (config, stats), without the
+  embedding arrays and the sklearn estimators, which inference doesn't use,
+  plus the SHA-256 of model.pkl so stale exports are detected at startup
+
+BookRecommender memory-maps these files at startup instead of unpickling
+model.pkl, so worker processes share the arrays through the page cache.
+
+Usage:
+    python ml/training/export_arrays.py [path/to/model.pkl]
+"""
+
+import pickle
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add the repository root to path so we can import from ml.inference
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from ml.inference.predictor import (
+    CLUSTER_LABELS_FILE,
+    CLUSTER_OFFSETS_FILE,
+    CLUSTER_PERM_FILE,
+    EMBEDDINGS_FILE,
+    EMBEDDINGS_I8_FILE,
+    MODEL_CONFIG_FILE,
+    NEIGHBORS_IDX_FILE,
+    NEIGHBORS_SIM_FILE,
+    SOURCE_HASH_KEY,
+    build_neighbor_table,
+    file_sha256,
+    group_by_cluster,
+    normalize_embeddings,
+    quantize_int8,
+)
+
+# Package entries that are stored as .npy files or not needed for inference
+EXCLUDED_KEYS = {
+    "embeddings",
+    "embeddings_i8",
+    "embedding_scales",
+    "cluster_labels",
+    "nn_model",
+    "kmeans_model",
+}
+
+
+def export_arrays(model_path: Path) -> None:
+    """Export the serving arrays for the model package at model_path."""
+    with open(model_path, "rb") as f:
+        package = pickle.load(f)
+
+    cluster_labels = np.asarray(package["cluster_labels"])
+    perm, offsets = group_by_cluster(cluster_labels)
+    embeddings = normalize_embeddings(package["embeddings"])[perm]
+
+    training_dir = model_path.parent
+    np.save(training_dir / EMBEDDINGS_FILE, embeddings)
+    np.save(training_dir / EMBEDDINGS_I8_FILE, quantize_int8(embeddings))
+    np.save(training_dir / CLUSTER_PERM_FILE, perm)
+    np.save(training_dir / CLUSTER_OFFSETS_FILE, offsets)
+    np.save(training_dir / CLUSTER_LABELS_FILE, cluster_labels)
+
+    neighbor_idx, neighbor_sim = build_neighbor_table(embeddings, perm, offsets)
+    np.save(training_dir / NEIGHBORS_IDX_FILE, neighbor_idx)
+    np.save(training_dir / NEIGHBORS_SIM_FILE, neighbor_sim)
+
+    model_config = {key: value for key, value in package.items() if key not in EXCLUDED_KEYS}
+    model_config[SOURCE_HASH_KEY] = file_sha256(model_path)
+    with open(training_dir / MODEL_CONFIG_FILE, "wb") as f:
+        pickle.dump(model_config, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    print(f"✅ Saved {embeddings.shape} embeddings in {len(offsets) - 1} clusters to {training_dir}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        export_arrays(Path(sys.argv[1]))
+    else:
+        export_arrays(Path(__file__).parent / "model.pkl")